@@ -1,10 +1,23 @@
 import bpy
 import os
 import re
+import bisect
+import csv
+import hashlib
+import json
+import mmap
+import shutil
+import struct
+import tempfile
+import threading
 import bmesh
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from mathutils import Vector
 from bpy.types import Operator, Panel
-from bpy.props import StringProperty, FloatProperty
+from bpy.props import StringProperty, FloatProperty, IntProperty
 
 bl_info = {
     "name": "建筑模型检修工具1.4",
@@ -34,41 +47,271 @@ def clear_scene_data(purge_orphans=True):
     
     # 清理孤立数据
     if purge_orphans:
-        for _ in range(3):
-            bpy.ops.outliner.orphans_purge(do_recursive=True)
+        purge_unused_data()
+
+
+# 场景、界面等根数据块不参与清理
+_PURGE_KEEP_TYPES = {'SCENE', 'WINDOWMANAGER', 'WORKSPACE', 'SCREEN', 'LIBRARY'}
+
+
+def _is_purgeable(id_data):
+    return (
+        id_data.id_type not in _PURGE_KEEP_TYPES
+        and id_data.library is None
+        and not id_data.use_fake_user
+        and not id_data.use_extra_user
+    )
 
 
 def purge_unused_data():
-    """清理所有未使用的数据块"""
-#删除所有物体
-#    bpy.ops.object.select_all(action='SELECT')
-#    bpy.ops.object.delete(use_global=True)
-
-    # 定义需要清理的数据类型
-    data_types = [
-        'materials', 'textures',
-        'images', 'brushes', 'particles',
-        'actions', 'fonts', 'node_groups',
-        'armatures', 'curves', 'lattices',
-        'metaballs', 'grease_pencils', 'cameras',
-        'speakers', 'lights', 'lightprobes',
-        'collections', 'worlds'
-    ]
+    """清理所有未使用的数据块
+
+    用 user_map 一次性求出引用关系：先取用户数为0的数据块，再递归加入只被这些
+    数据块引用的数据块（等同 orphans_purge 递归清理），最后一次 batch_remove。
+    不依赖操作符上下文。
+    """
+    user_map = bpy.data.user_map()
+
+    # 反向映射：数据块 -> 它引用的数据块
+    uses = {}
+    for id_data, users in user_map.items():
+        for user in users:
+            uses.setdefault(user, []).append(id_data)
+
+    removable = {
+        id_data for id_data in user_map
+        if id_data.users == 0 and _is_purgeable(id_data)
+    }
+    stack = list(removable)
+    while stack:
+        for dep in uses.get(stack.pop(), ()):
+            if dep in removable or not _is_purgeable(dep):
+                continue
+            if user_map[dep] - {dep} <= removable:
+                removable.add(dep)
+                stack.append(dep)
+
+    if removable:
+        bpy.data.batch_remove(removable)
+    return len(removable)
+
+
+# ==================== 批处理I/O（预读/延迟写出） ====================
+# FBX中引用贴图的扩展名（二进制FBX为长度前缀字符串，ASCII FBX为引号字符串）
+_FBX_TEXTURE_EXT = re.compile(
+    rb"\.(?:png|jpe?g|tga|tiff?|bmp|exr|hdr|dds)(?![0-9A-Za-z])", re.IGNORECASE
+)
+_FBX_PATH_DELIMITER = re.compile(rb'[\x00-\x1f"*?<>|]')
+
+
+def fbx_texture_refs(fbx_path):
+    """从FBX文件中提取引用的贴图路径（不解析FBX结构，只扫描字符串）"""
+    refs = set()
+    if os.path.getsize(fbx_path) == 0:
+        return refs
+    with open(fbx_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for m in _FBX_TEXTURE_EXT.finditer(mm):
+            # 从扩展名向前回溯到分隔符，得到完整路径
+            head = mm[max(0, m.start() - 260):m.start()]
+            name = _FBX_PATH_DELIMITER.split(head)[-1] + m.group()
+            refs.add(name.decode('utf-8', errors='ignore').replace('\\', '/'))
+    return refs
+
+
+def _copy_staged(tex_src, tex_dst):
+    if os.path.exists(tex_dst):
+        return
+    try:
+        os.makedirs(os.path.dirname(tex_dst), exist_ok=True)
+        shutil.copyfile(tex_src, tex_dst)
+    except OSError as e:
+        print(f"预读贴图 {tex_src} 失败: {str(e)}")
+
+
+def _stage_input(src, stage_dir, search_index):
+    """把FBX及导入器会用到的贴图复制到本地临时目录，返回本地FBX路径
+
+    与导入器的查找顺序一致：存在的绝对路径直接使用（不复制）；相对路径（含 ..）
+    按源目录解析并在本地保持相同相对位置；都找不到时按文件名在源目录中递归查找。
+    search_index 缓存各源目录的 {小写文件名: 路径}，避免重复遍历。
+    """
+    os.makedirs(stage_dir, exist_ok=True)
+    fetched_path = os.path.join(stage_dir, os.path.basename(src))
+    shutil.copyfile(src, fetched_path)
+    refs = fbx_texture_refs(fetched_path)
+
+    # 引用中有多少级 ..，FBX就放在多深的子目录里，使相对路径仍落在临时目录内
+    depth = 0
+    for ref in refs:
+        if ref and not os.path.isabs(ref):
+            parts = os.path.normpath(ref).split(os.sep)
+            ups = next((i for i, part in enumerate(parts) if part != os.pardir), len(parts))
+            depth = max(depth, ups)
+    local_dir = os.path.join(stage_dir, *(f"_{i}" for i in range(depth)))
+    local_path = os.path.join(local_dir, os.path.basename(src))
+    os.makedirs(local_dir, exist_ok=True)
+    os.replace(fetched_path, local_path)
+
+    src_dir = os.path.dirname(src)
+    for ref in refs:
+        if not ref or (os.path.isabs(ref) and os.path.isfile(ref)):
+            continue
+        name = os.path.basename(ref)
+        candidates = [name]
+        if not os.path.isabs(ref):
+            candidates.insert(0, os.path.normpath(ref))
+        rel = next(
+            (c for c in candidates if os.path.isfile(os.path.join(src_dir, c))), None
+        )
+        if rel is None:
+            # 导入器的递归查找
+            if src_dir not in search_index:
+                search_index[src_dir] = {}
+                for root, dirs, files in os.walk(src_dir):
+                    for f in files:
+                        search_index[src_dir].setdefault(f.lower(), os.path.join(root, f))
+            found = search_index[src_dir].get(name.lower())
+            if found is None:
+                continue
+            rel = os.path.relpath(found, src_dir)
+        _copy_staged(
+            os.path.normpath(os.path.join(src_dir, rel)),
+            os.path.normpath(os.path.join(local_dir, rel)),
+        )
+    return local_path
+
+
+class FileStager:
+    """批处理文件预读/延迟写出
+
+    后台线程提前把后续 read_ahead 个FBX及其引用贴图复制到本地临时目录，
+    导出结果先写入本地，再由后台线程移动到目标目录。
+    read_ahead 为0时直接读写原路径。
+    处理完的文件及其贴图在取下一个文件时删除；场景中仍引用的贴图须先用
+    source_path() 指回源路径。
+    """
+
+    def __init__(self, input_paths, read_ahead=2, max_pending_writes=2, scratch_root=""):
+        self.input_paths = list(input_paths)
+        self.read_ahead = read_ahead
+        self.errors = []
+        self.scratch_dir = None
+        self._current = None
+        if read_ahead <= 0:
+            return
 
-    # 遍历所有数据类型
-    for data_type in data_types:
-        data_collection = getattr(bpy.data, data_type)
-        # 创建列表避免在遍历时修改集合
-        for item in list(data_collection):
-            if item.users == 0:
-                try:
-                    data_collection.remove(item)
-                except Exception as e:
-                    print(f"Error removing {data_type}: {item.name} - {str(e)}")
+        self.scratch_dir = tempfile.mkdtemp(prefix="archicheck_", dir=scratch_root or None)
+        os.makedirs(os.path.join(self.scratch_dir, "out"))
+        self._reader = ThreadPoolExecutor(max_workers=1)
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        # 限制排队中的写出数量，控制临时目录占用
+        self._write_slots = threading.BoundedSemaphore(max(1, max_pending_writes))
+        self._output_count = 0
+        self._search_index = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        """依次产出 (源路径, 本地路径)，处理当前文件时后台预读后续文件"""
+        if self.scratch_dir is None:
+            for path in self.input_paths:
+                yield path, path
+            return
+
+        pending = deque()
+        remaining = iter(enumerate(self.input_paths))
+
+        def fill():
+            while len(pending) < self.read_ahead:
+                item = next(remaining, None)
+                if item is None:
+                    return
+                index, src = item
+                stage_dir = os.path.join(self.scratch_dir, f"in_{index}")
+                pending.append((src, stage_dir, self._reader.submit(
+                    _stage_input, src, stage_dir, self._search_index
+                )))
+
+        fill()
+        while pending:
+            src, stage_dir, future = pending.popleft()
+            fill()
+            try:
+                local_path = future.result()
+            except Exception as e:
+                # 预读失败时退回直接读取源文件
+                self.errors.append(f"预读 {src} 失败: {str(e)}")
+                local_path = src
+            self._current = (src, local_path, stage_dir)
+            try:
+                yield src, local_path
+            finally:
+                self._current = None
+                shutil.rmtree(stage_dir, ignore_errors=True)
+
+    def source_path(self, path):
+        """把当前文件临时目录中的路径映射回对应的源路径，其他路径原样返回"""
+        if self._current is None:
+            return path
+        src, local_path, stage_dir = self._current
+        path = os.path.normpath(path)
+        try:
+            if os.path.commonpath([path, stage_dir]) != os.path.normpath(stage_dir):
+                return path
+        except ValueError:
+            # 不同盘符
+            return path
+        return os.path.normpath(os.path.join(
+            os.path.dirname(src), os.path.relpath(path, os.path.dirname(local_path))
+        ))
+
+    @contextmanager
+    def output(self, dest_path):
+        """提供导出时实际写入的路径，写入成功后异步移动到 dest_path"""
+        if self.scratch_dir is None:
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            yield dest_path
+            return
 
-    # 执行Blender内置的孤立数据清理（推荐方式）
-    for _ in range(3):
-        bpy.ops.outliner.orphans_purge(do_recursive=True)
+        self._output_count += 1
+        local_path = os.path.join(
+            self.scratch_dir, "out", f"{self._output_count}_{os.path.basename(dest_path)}"
+        )
+        yield local_path
+        self._write_slots.acquire()
+        self._writer.submit(self._move_output, local_path, dest_path)
+
+    def _move_output(self, local_path, dest_path):
+        try:
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            shutil.move(local_path, dest_path)
+        except OSError as e:
+            self.errors.append(f"写出 {dest_path} 失败: {str(e)}")
+        finally:
+            self._write_slots.release()
+
+    def close(self):
+        """等待所有写出完成并清理临时目录"""
+        if self.scratch_dir is None:
+            return
+        self._reader.shutdown(wait=True, cancel_futures=True)
+        self._writer.shutdown(wait=True)
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+        self.scratch_dir = None
+
+
+def make_file_stager(scene, input_paths):
+    """按场景中的I/O设置创建 FileStager"""
+    return FileStager(
+        input_paths,
+        read_ahead=scene.io_read_ahead,
+        max_pending_writes=scene.io_write_queue,
+        scratch_root=bpy.path.abspath(scene.io_scratch_dir),
+    )
 
 
 # ==================== 新增基础功能面板 ====================
@@ -134,6 +377,7 @@ class BASE_PT_Panel(Panel):
 
     def draw(self, context):
         layout = self.layout
+        scene = context.scene
         box = layout.box()
         box.label(text="场景管理", icon='WORLD')
         box.operator("base.clear_scene", icon='TRASH')
@@ -144,6 +388,12 @@ class BASE_PT_Panel(Panel):
         box.operator("base.protect_materials", text="保护材质贴图")
         box.operator("base.purge_unused", text="清理未使用数据")
 
+        box = layout.box()
+        box.label(text="批处理I/O", icon='FILE_REFRESH')
+        box.prop(scene, "io_read_ahead", text="预读文件数")
+        box.prop(scene, "io_write_queue", text="写出队列")
+        box.prop(scene, "io_scratch_dir", text="本地缓存")
+
 
 # ==================== 1. UV处理工具 ====================
 class UVTOOLS_OT_BatchProcess(Operator):
@@ -156,7 +406,7 @@ class UVTOOLS_OT_BatchProcess(Operator):
         a_folder_UV = bpy.path.abspath(scene.a_folder_UV)
         b_folder_UV = bpy.path.abspath(scene.b_folder_UV)
 
-        def process_single_fbx(fbx_path):
+        def process_single_fbx(fbx_path, stager):
             clear_scene_data(purge_orphans=False)
             try:
                 bpy.ops.import_scene.fbx(filepath=fbx_path)
@@ -200,11 +450,12 @@ class UVTOOLS_OT_BatchProcess(Operator):
 
                 if success_count > 0:
                     output_path = os.path.join(b_folder_UV, f"{base_name}.fbx")
-                    bpy.ops.export_scene.fbx(
-                        filepath=output_path,
-                        path_mode='COPY', 
-                       embed_textures=True  # 新增嵌入贴图
-                    )
+                    with stager.output(output_path) as local_output:
+                        bpy.ops.export_scene.fbx(
+                            filepath=local_output,
+                            path_mode='COPY', 
+                           embed_textures=True  # 新增嵌入贴图
+                        )
                     return True
 
             except Exception as e:
@@ -225,13 +476,365 @@ class UVTOOLS_OT_BatchProcess(Operator):
             return {'CANCELLED'}
 
         success = 0
-        for fbx in fbx_files:
-            if process_single_fbx(os.path.join(a_folder_UV, fbx)):
-                success += 1
+        with make_file_stager(scene, [os.path.join(a_folder_UV, f) for f in fbx_files]) as stager:
+            for _, local_path in stager:
+                if process_single_fbx(local_path, stager):
+                    success += 1
+        for err in stager.errors:
+            self.report({'WARNING'}, err)
 
         self.report({'INFO'}, f"完成! 成功处理 {success}/{len(fbx_files)} 个文件")
         return {'FINISHED'}
 
+
+# ==================== UV密度与重叠检查 ====================
+UV_GRID_MAX_SAMPLES = 4_000_000  # 重叠检测单批最大采样数
+UV_OVERLAP_NOTE = (
+    "重叠检测对包围盒共享网格的三角形对做精确相交测试（边相交或顶点/重心落入对方内部）；"
+    "仅接触（共边、共点）不计为重叠，误差 1e-12 以内的相交可能漏检"
+)
+
+
+def mesh_uv_faces(obj):
+    """逐三角形读取世界坐标与UV，按面汇总UV面积和世界面积
+
+    返回 dict: material_index/uv_area/world_area (按面), tri_polys/tri_uvs (按三角形),
+    loop_polys/loop_verts/loop_uvs (按面角)。没有UV层时返回 None。
+    """
+    mesh = obj.data
+    uv_layer = mesh.uv_layers.active
+    if uv_layer is None or not len(mesh.polygons):
+        return None
+
+    n_polys = len(mesh.polygons)
+    n_loops = len(mesh.loops)
+    mesh.calc_loop_triangles()
+    n_tris = len(mesh.loop_triangles)
+
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get('co', co)
+    matrix = np.array(obj.matrix_world)
+    co = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+
+    loop_verts = np.empty(n_loops, dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_verts)
+    loop_uvs = np.empty(n_loops * 2, dtype=np.float64)
+    uv_layer.data.foreach_get('uv', loop_uvs)
+    loop_uvs = loop_uvs.reshape(-1, 2)
+
+    tri_loops = np.empty(n_tris * 3, dtype=np.int32)
+    tri_polys = np.empty(n_tris, dtype=np.int32)
+    mesh.loop_triangles.foreach_get('loops', tri_loops)
+    mesh.loop_triangles.foreach_get('polygon_index', tri_polys)
+    tri_loops = tri_loops.reshape(-1, 3)
+
+    tri_co = co[loop_verts[tri_loops]]
+    tri_uvs = loop_uvs[tri_loops]
+    world_area = 0.5 * np.linalg.norm(
+        np.cross(tri_co[:, 1] - tri_co[:, 0], tri_co[:, 2] - tri_co[:, 0]), axis=1
+    )
+    uv_edge1 = tri_uvs[:, 1] - tri_uvs[:, 0]
+    uv_edge2 = tri_uvs[:, 2] - tri_uvs[:, 0]
+    uv_area = 0.5 * np.abs(uv_edge1[:, 0] * uv_edge2[:, 1] - uv_edge1[:, 1] * uv_edge2[:, 0])
+
+    material_index = np.empty(n_polys, dtype=np.int32)
+    loop_totals = np.empty(n_polys, dtype=np.int32)
+    mesh.polygons.foreach_get('material_index', material_index)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+
+    return {
+        'material_index': material_index,
+        'uv_area': np.bincount(tri_polys, uv_area, minlength=n_polys),
+        'world_area': np.bincount(tri_polys, world_area, minlength=n_polys),
+        'tri_polys': tri_polys,
+        'tri_uvs': tri_uvs,
+        'loop_polys': np.repeat(np.arange(n_polys), loop_totals),
+        'loop_verts': loop_verts,
+        'loop_uvs': loop_uvs,
+    }
+
+
+def uv_islands(n_polys, loop_polys, loop_verts, loop_uvs):
+    """UV岛编号：共享顶点且UV相同的面属于同一岛（并查集式标签传播 + 指针跳跃）"""
+    quantized = np.round(loop_uvs * 1e5).astype(np.int64)
+    _, keys = np.unique(
+        np.column_stack((loop_verts, quantized)), axis=0, return_inverse=True
+    )
+    keys = keys.ravel()
+    n_keys = keys.max() + 1 if len(keys) else 0
+
+    parent = np.arange(n_polys)
+    while True:
+        key_min = np.full(n_keys, n_polys)
+        np.minimum.at(key_min, keys, parent[loop_polys])
+        hooked = parent.copy()
+        np.minimum.at(hooked, parent[loop_polys], key_min[keys])
+        # 指针跳跃直到每个面直接指向根
+        while True:
+            jumped = hooked[hooked]
+            if np.array_equal(jumped, hooked):
+                break
+            hooked = jumped
+        if np.array_equal(hooked, parent):
+            return parent
+        parent = hooked
+
+
+_OVERLAP_EPS = 1e-12
+
+
+def _strictly_inside(points, a, b, c):
+    """点是否严格在三角形内部（恰好落在边上的点不算）"""
+    def edge_side(p0, p1):
+        return (p1[:, 0] - p0[:, 0]) * (points[:, 1] - p0[:, 1]) - (p1[:, 1] - p0[:, 1]) * (points[:, 0] - p0[:, 0])
+
+    d0, d1, d2 = edge_side(a, b), edge_side(b, c), edge_side(c, a)
+    eps = _OVERLAP_EPS
+    return ((d0 > eps) & (d1 > eps) & (d2 > eps)) | ((d0 < -eps) & (d1 < -eps) & (d2 < -eps))
+
+
+def _triangles_overlap(tri_a, tri_b):
+    """两组三角形 (n,3,2) 逐对判断内部是否相交：边严格相交，或一方的顶点/重心严格落在另一方内部"""
+    def orient(p, q, r):
+        return (q[:, 0] - p[:, 0]) * (r[:, 1] - p[:, 1]) - (q[:, 1] - p[:, 1]) * (r[:, 0] - p[:, 0])
+
+    eps = _OVERLAP_EPS
+    hit = np.zeros(len(tri_a), dtype=bool)
+    for i in range(3):
+        p, q = tri_a[:, i], tri_a[:, (i + 1) % 3]
+        for j in range(3):
+            r, t = tri_b[:, j], tri_b[:, (j + 1) % 3]
+            o1, o2 = orient(p, q, r), orient(p, q, t)
+            o3, o4 = orient(r, t, p), orient(r, t, q)
+            hit |= (((o1 > eps) & (o2 < -eps)) | ((o1 < -eps) & (o2 > eps))) & \
+                   (((o3 > eps) & (o4 < -eps)) | ((o3 < -eps) & (o4 > eps)))
+    for inner, outer in ((tri_a, tri_b), (tri_b, tri_a)):
+        for point in (inner[:, 0], inner[:, 1], inner[:, 2], inner.mean(axis=1)):
+            hit |= _strictly_inside(point, outer[:, 0], outer[:, 1], outer[:, 2])
+    return hit
+
+
+def _expand_ranges(starts, counts):
+    """把 [start, start+count) 区间展开为 (区间编号, 下标)"""
+    owners = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, np.repeat(starts, counts) + offsets
+
+
+def uv_overlap_faces(tri_uvs, tri_polys, n_polys):
+    """用空间网格检测UV重叠，返回按面的重叠标记
+
+    网格边长取三角形UV包围盒尺寸的中位数（展开数超出上限时逐级加倍）。
+    包围盒落在同一网格的三角形对做精确相交测试；每对只在两者包围盒最小角
+    较大者所在的网格中测试一次。
+    """
+    overlapping = np.zeros(n_polys, dtype=bool)
+    n_tris = len(tri_uvs)
+    if n_tris < 2:
+        return overlapping
+
+    lo = tri_uvs.min(axis=(0, 1))
+    tri_min = tri_uvs.min(axis=1)
+    tri_max = tri_uvs.max(axis=1)
+    sizes = (tri_max - tri_min).max(axis=1)
+    cell = float(np.median(sizes[sizes > 0])) if (sizes > 0).any() else 1.0
+    while True:
+        cell_min = ((tri_min - lo) / cell).astype(np.int64)
+        cell_max = ((tri_max - lo) / cell).astype(np.int64)
+        spans = cell_max - cell_min + 1
+        counts = spans[:, 0] * spans[:, 1]
+        if counts.sum() <= UV_GRID_MAX_SAMPLES:
+            break
+        cell *= 2
+    n_cols = int(cell_max[:, 0].max()) + 1
+
+    # 展开为 (三角形, 网格) 对，按网格排序
+    tris, offsets = _expand_ranges(np.zeros(n_tris, dtype=np.int64), counts)
+    cells = (cell_min[tris, 1] + offsets // spans[tris, 0]) * n_cols \
+        + cell_min[tris, 0] + offsets % spans[tris, 0]
+    order = np.argsort(cells, kind='stable')
+    cells, tris = cells[order], tris[order]
+    # 每项与同网格中排在其后的项组成候选对
+    partners = np.searchsorted(cells, cells, 'right') - np.arange(len(cells)) - 1
+
+    # 分批处理，控制内存
+    batch_ends = np.searchsorted(
+        np.cumsum(partners), np.arange(UV_GRID_MAX_SAMPLES, partners.sum(), UV_GRID_MAX_SAMPLES)
+    )
+    for batch in np.split(np.arange(len(cells)), batch_ends):
+        owners, positions = _expand_ranges(batch + 1, partners[batch])
+        first = batch[owners]
+        a, b = tris[first], tris[positions]
+        ref = np.maximum(cell_min[a], cell_min[b])
+        keep = (
+            (ref[:, 1] * n_cols + ref[:, 0] == cells[first])
+            & (tri_min[a] <= tri_max[b]).all(axis=1)
+            & (tri_min[b] <= tri_max[a]).all(axis=1)
+        )
+        a, b = a[keep], b[keep]
+        hit = _triangles_overlap(tri_uvs[a], tri_uvs[b])
+        overlapping[tri_polys[a[hit]]] = True
+        overlapping[tri_polys[b[hit]]] = True
+    return overlapping
+
+
+def _density_stats(density, world_area, outliers, overlapping, island_count=None):
+    """汇总密度统计（密度 = sqrt(UV面积/世界面积)，单位 UV/米）"""
+    stats = {
+        'faces': int(len(density)),
+        'world_area': float(world_area.sum()),
+        'outlier_faces': int(outliers.sum()),
+        'outlier_area_ratio': float(world_area[outliers].sum() / world_area.sum()) if len(density) else 0.0,
+        'overlap_faces': int(overlapping.sum()),
+        'overlap_area_ratio': float(world_area[overlapping].sum() / world_area.sum()) if len(density) else 0.0,
+    }
+    if island_count is not None:
+        stats['islands'] = int(island_count)
+    if len(density):
+        p5, median, p95 = np.percentile(density, (5, 50, 95))
+        stats.update({
+            'mean': float(np.average(density, weights=world_area)),
+            'median': float(median),
+            'p5': float(p5),
+            'p95': float(p95),
+            'min': float(density.min()),
+            'max': float(density.max()),
+        })
+    return stats
+
+
+def analyze_uv_density(objects):
+    """分析物体的UV密度与重叠，按材质返回逐面数据（密度、世界面积、重叠标记、岛数）"""
+    per_material = {}
+    for obj in objects:
+        if obj.type != 'MESH':
+            continue
+        faces = mesh_uv_faces(obj)
+        if faces is None:
+            continue
+
+        n_polys = len(faces['material_index'])
+        islands = uv_islands(n_polys, faces['loop_polys'], faces['loop_verts'], faces['loop_uvs'])
+        valid = faces['world_area'] > 1e-12
+        density = np.sqrt(faces['uv_area'] / np.where(valid, faces['world_area'], 1.0))
+
+        for mat_index in np.unique(faces['material_index']):
+            slot_mat = obj.material_slots[mat_index].material if mat_index < len(obj.material_slots) else None
+            mat_name = slot_mat.name if slot_mat else "<无材质>"
+            face_mask = (faces['material_index'] == mat_index) & valid
+            # 重叠检测按物体、材质分别进行
+            tri_mask = face_mask[faces['tri_polys']]
+            overlapping = uv_overlap_faces(
+                faces['tri_uvs'][tri_mask], faces['tri_polys'][tri_mask], n_polys
+            )
+            entry = per_material.setdefault(
+                mat_name, {'density': [], 'world_area': [], 'overlapping': [], 'islands': 0}
+            )
+            entry['density'].append(density[face_mask])
+            entry['world_area'].append(faces['world_area'][face_mask])
+            entry['overlapping'].append(overlapping[face_mask])
+            entry['islands'] += len(np.unique(islands[face_mask]))
+
+    return {
+        mat_name: {
+            'density': np.concatenate(entry['density']),
+            'world_area': np.concatenate(entry['world_area']),
+            'overlapping': np.concatenate(entry['overlapping']),
+            'islands': entry['islands'],
+        }
+        for mat_name, entry in per_material.items()
+    }
+
+
+class UVTOOLS_OT_AnalyzeDensity(Operator):
+    bl_idname = "uvtools.analyze_density"
+    bl_label = "检查UV密度与重叠"
+    bl_description = "统计输出目录中FBX的UV纹素密度与重叠并生成报告"
+
+    def execute(self, context):
+        scene = context.scene
+        folder = bpy.path.abspath(scene.b_folder_UV)
+        if not os.path.isdir(folder):
+            self.report({'ERROR'}, f"无效输出路径: {folder}")
+            return {'CANCELLED'}
+
+        fbx_paths = [
+            os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.lower().endswith('.fbx')
+        ]
+        if not fbx_paths:
+            self.report({'ERROR'}, "没有找到FBX文件")
+            return {'CANCELLED'}
+
+        # 先收集整批数据，异常以全批次同材质的中位密度为基准
+        file_results = {}
+        with make_file_stager(scene, fbx_paths) as stager:
+            for input_path, local_path in stager:
+                clear_scene_data(purge_orphans=False)
+                try:
+                    bpy.ops.import_scene.fbx(filepath=local_path)
+                    file_results[os.path.basename(input_path)] = analyze_uv_density(context.scene.objects)
+                except Exception as e:
+                    self.report({'ERROR'}, f"分析 {input_path} 失败: {str(e)}")
+                finally:
+                    clear_scene_data()
+        for err in stager.errors:
+            self.report({'WARNING'}, err)
+
+        batch = {}
+        for results in file_results.values():
+            for mat_name, r in results.items():
+                batch.setdefault(mat_name, []).append(r)
+        log_medians = {
+            mat_name: float(np.median(np.log(np.maximum(np.concatenate([r['density'] for r in rs]), 1e-12))))
+            for mat_name, rs in batch.items() if sum(len(r['density']) for r in rs)
+        }
+        log_tolerance = np.log(scene.density_tolerance)
+        for results in file_results.values():
+            for mat_name, r in results.items():
+                deviation = np.log(np.maximum(r['density'], 1e-12)) - log_medians.get(mat_name, 0.0)
+                r['outliers'] = np.abs(deviation) > log_tolerance
+
+        def concat_stats(rs):
+            return _density_stats(
+                *(np.concatenate([r[key] for r in rs]) for key in ('density', 'world_area', 'outliers', 'overlapping')),
+                sum(r['islands'] for r in rs)
+            )
+
+        report = {
+            'tolerance': scene.density_tolerance,
+            'overlap_note': UV_OVERLAP_NOTE,
+            'files': {},
+            'materials': {},
+        }
+        for file_name, results in file_results.items():
+            materials = {}
+            for mat_name, r in results.items():
+                stats = concat_stats([r])
+                if 'median' in stats and mat_name in log_medians:
+                    # 本文件该材质的中位密度相对全批次的倍数
+                    stats['median_ratio'] = stats['median'] / float(np.exp(log_medians[mat_name]))
+                materials[mat_name] = stats
+            report['files'][file_name] = {
+                'total': concat_stats(list(results.values())) if results else {},
+                'materials': materials,
+            }
+        for mat_name, rs in batch.items():
+            report['materials'][mat_name] = concat_stats(rs)
+
+        report_path = os.path.join(folder, "uv_density_report.json")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        target = report['materials'].get(scene.target_material_name)
+        if target and target['faces']:
+            self.report({'INFO'}, (
+                f"{scene.target_material_name}: 中位密度 {target['median']:.3f}, "
+                f"异常面 {target['outlier_faces']}, 重叠面 {target['overlap_faces']}。报告: {report_path}"
+            ))
+        else:
+            self.report({'INFO'}, f"报告已生成: {report_path}")
+        return {'FINISHED'}
+
 class UVTOOLS_PT_Panel(Panel):
     bl_label = "1.对目标材质的面展UV"
     bl_idname = "VIEW3D_PT_uv_tools"
@@ -254,7 +857,349 @@ class UVTOOLS_PT_Panel(Panel):
         
         layout.operator("uvtools.batch_process", icon='EXPORT')
 
+        box = layout.box()
+        box.label(text="UV密度检查（输出目录）", icon='UV')
+        box.prop(scene, "density_tolerance", text="密度容差倍数")
+        box.operator("uvtools.analyze_density", icon='VIEWZOOM')
+
 # ==================== 2. 贴图工具 ====================
+TEXTURE_EXTS = {'.png', '.jpg', '.jpeg', '.tga', '.tif', '.tiff'}
+
+# ORM通道顺序：R=AO, G=Roughness, B=Metallic；缺失通道的填充值
+ORM_CHANNELS = (('AO', 1.0), ('Roughness', 0.5), ('Metallic', 0.0))
+
+
+def list_texture_files(tex_dir):
+    """列出目录中支持的贴图文件名"""
+    return [f for f in os.listdir(tex_dir) if os.path.splitext(f)[1].lower() in TEXTURE_EXTS]
+
+
+def texture_name_index(file_names):
+    """按文件名（不含扩展名）排序，供前缀二分查找"""
+    return sorted((os.path.splitext(f)[0], f) for f in file_names)
+
+
+def match_textures(name_index, mat_name, suffix):
+    """按 材质名_类型 的命名变体（原样/小写/大写）返回所有匹配的贴图文件名
+
+    顺序为变体顺序、同一变体内按文件名排序。
+    """
+    matches = []
+    for variant in dict.fromkeys((f"{mat_name}_{suffix}", f"{mat_name}_{suffix.lower()}",
+                                  f"{mat_name}_{suffix.upper()}")):
+        i = bisect.bisect_left(name_index, (variant,))
+        while i < len(name_index) and name_index[i][0].startswith(variant):
+            f = name_index[i][1]
+            if f not in matches:
+                matches.append(f)
+            i += 1
+    return matches
+
+
+def find_texture(tex_dir, name_index, mat_name, suffix):
+    """返回第一个匹配的贴图路径（与 match_textures 的顺序一致，结果确定）"""
+    matches = match_textures(name_index, mat_name, suffix)
+    return os.path.join(tex_dir, matches[0]) if matches else None
+
+
+def _file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pack_orm_texture(mat_name, sources, cache_dir):
+    """把AO/Roughness/Metallic灰度贴图合并为一张ORM贴图，返回贴图路径
+
+    sources 为 {类型: 路径或None}。结果按源文件内容哈希缓存在 cache_dir，
+    源文件未变化时直接复用，不再解码源贴图。
+    """
+    key = hashlib.blake2b(digest_size=8)
+    for suffix, _ in ORM_CHANNELS:
+        path = sources.get(suffix)
+        key.update(f"{suffix}:{_file_digest(path) if path else '-'};".encode())
+    packed_path = os.path.join(cache_dir, f"{mat_name}_ORM_{key.hexdigest()}.png")
+    if os.path.isfile(packed_path):
+        return packed_path
+
+    images = {
+        suffix: bpy.data.images.load(path, check_existing=False)
+        for suffix, path in sources.items() if path
+    }
+    try:
+        width = max(img.size[0] for img in images.values())
+        height = max(img.size[1] for img in images.values())
+        packed = np.ones((width * height, 4), dtype=np.float32)
+        pixels = np.empty(width * height * 4, dtype=np.float32)
+
+        for channel, (suffix, fill) in enumerate(ORM_CHANNELS):
+            img = images.get(suffix)
+            if img is None:
+                packed[:, channel] = fill
+                continue
+            img.colorspace_settings.name = 'Non-Color'
+            if tuple(img.size) != (width, height):
+                img.scale(width, height)
+            img.pixels.foreach_get(pixels)
+            # 灰度贴图取R通道
+            packed[:, channel] = pixels[0::4]
+
+        os.makedirs(cache_dir, exist_ok=True)
+        packed_image = bpy.data.images.new(f"{mat_name}_ORM", width, height, alpha=False)
+        try:
+            packed_image.colorspace_settings.name = 'Non-Color'
+            packed_image.pixels.foreach_set(packed.ravel())
+            packed_image.filepath_raw = packed_path
+            packed_image.file_format = 'PNG'
+            packed_image.save()
+        finally:
+            bpy.data.images.remove(packed_image)
+    finally:
+        # 源贴图解码后立即释放
+        for img in images.values():
+            bpy.data.images.remove(img)
+
+    return packed_path
+
+
+# ==================== 贴图头信息探测 ====================
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+# JPEG中带尺寸信息的SOF标记（排除DHT/JPG/DAC）
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _probe_png(f):
+    head = f.read(26)
+    if len(head) < 26 or head[:8] != b'\x89PNG\r\n\x1a\n' or head[12:16] != b'IHDR':
+        return None
+    width, height, bit_depth, color_type = struct.unpack('>IIBB', head[16:26])
+    return width, height, _PNG_CHANNELS.get(color_type, 0), bit_depth, 'PNG'
+
+
+def _probe_jpeg(f):
+    if f.read(2) != b'\xff\xd8':
+        return None
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] == 0xFF:
+            # 填充字节
+            f.seek(-1, os.SEEK_CUR)
+            continue
+        if marker[1] == 0xDA:
+            # 已到扫描数据仍未找到SOF
+            return None
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        length = struct.unpack('>H', length)[0]
+        if marker[1] in _JPEG_SOF_MARKERS:
+            segment = f.read(6)
+            if len(segment) < 6:
+                return None
+            bit_depth, height, width, channels = struct.unpack('>BHHB', segment)
+            return width, height, channels, bit_depth, 'JPEG'
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _probe_tga(f):
+    head = f.read(18)
+    if len(head) < 18:
+        return None
+    image_type = head[2]
+    width, height, pixel_depth, descriptor = struct.unpack('<HHBB', head[12:18])
+    if image_type not in (1, 2, 3, 9, 10, 11) or not width or not height:
+        return None
+    if image_type in (3, 11):
+        channels = 2 if descriptor & 0x0F else 1
+    elif image_type in (1, 9):
+        # 调色板图：位深取调色板条目大小，而不是索引位数
+        entry_size = head[7]
+        channels = 4 if entry_size == 32 else 3
+        return width, height, channels, max(entry_size // channels, 1), 'TGA'
+    else:
+        channels = 4 if pixel_depth == 32 or descriptor & 0x0F else 3
+    return width, height, channels, pixel_depth // channels, 'TGA'
+
+
+def _probe_tiff(f):
+    head = f.read(8)
+    if head[:4] == b'II*\x00':
+        endian = '<'
+    elif head[:4] == b'MM\x00*':
+        endian = '>'
+    else:
+        return None
+    f.seek(struct.unpack(endian + 'I', head[4:8])[0])
+    count = f.read(2)
+    if len(count) < 2:
+        return None
+    tags = {}
+    for _ in range(struct.unpack(endian + 'H', count)[0]):
+        entry = f.read(12)
+        if len(entry) < 12:
+            return None
+        tag, field_type, value_count = struct.unpack(endian + 'HHI', entry[:8])
+        if tag not in (256, 257, 258, 277):
+            continue
+        value = entry[8:12]
+        if field_type == 3:
+            if value_count > 2:
+                # 多个值存放在偏移处，只需第一个
+                position = f.tell()
+                f.seek(struct.unpack(endian + 'I', value)[0])
+                value = f.read(2)
+                f.seek(position)
+            tags[tag] = struct.unpack(endian + 'H', value[:2])[0]
+        elif field_type == 4:
+            tags[tag] = struct.unpack(endian + 'I', value)[0]
+    if 256 not in tags or 257 not in tags:
+        return None
+    return tags[256], tags[257], tags.get(277, 1), tags.get(258, 1), 'TIFF'
+
+
+_HEADER_PROBES = {
+    '.png': _probe_png,
+    '.jpg': _probe_jpeg,
+    '.jpeg': _probe_jpeg,
+    '.tga': _probe_tga,
+    '.tif': _probe_tiff,
+    '.tiff': _probe_tiff,
+}
+
+
+def read_image_header(path):
+    """只读取文件头获取 (宽, 高, 通道数, 位深, 格式)，不解码像素；无法识别时返回None"""
+    probe = _HEADER_PROBES.get(os.path.splitext(path)[1].lower())
+    if probe is None:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return probe(f)
+    except (OSError, struct.error):
+        return None
+
+
+def build_texture_coverage(tex_dir, mat_names, suffixes, max_size, max_workers=16):
+    """生成 材质 × 贴图类型 覆盖表，只读取贴图文件头
+
+    每格为 dict: status (ok/missing/ambiguous/oversized/unreadable), files, header。
+    """
+    name_index = texture_name_index(list_texture_files(tex_dir))
+    matches = {
+        (mat_name, suffix): match_textures(name_index, mat_name, suffix)
+        for mat_name in mat_names for suffix in suffixes
+    }
+
+    # 线程池并行读取所有匹配贴图的文件头
+    unique_files = sorted({f for files in matches.values() for f in files})
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        headers = dict(zip(unique_files, executor.map(
+            read_image_header, (os.path.join(tex_dir, f) for f in unique_files)
+        )))
+
+    coverage = {}
+    for (mat_name, suffix), files in matches.items():
+        header = headers[files[0]] if files else None
+        if not files:
+            status = 'missing'
+        elif len(files) > 1:
+            status = 'ambiguous'
+        elif header is None:
+            status = 'unreadable'
+        elif max(header[0], header[1]) > max_size:
+            status = 'oversized'
+        else:
+            status = 'ok'
+        coverage.setdefault(mat_name, {})[suffix] = {
+            'status': status, 'files': files, 'header': header,
+        }
+    return coverage
+
+
+def write_coverage_report(coverage, suffixes, report_path):
+    """把覆盖表写成CSV：每行一个材质，每列一种贴图类型"""
+    with open(report_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Material'] + list(suffixes))
+        for mat_name, row in sorted(coverage.items()):
+            cells = []
+            for suffix in suffixes:
+                cell = row[suffix]
+                text = cell['status']
+                if cell['header']:
+                    width, height, channels, bit_depth, fmt = cell['header']
+                    text += f" {width}x{height} {channels}ch {bit_depth}bit {fmt}"
+                if cell['files']:
+                    text += " | " + "; ".join(cell['files'])
+                if len(cell['files']) > 1:
+                    # 连接时使用第一个匹配
+                    text += f" | 使用 {cell['files'][0]}"
+                cells.append(text)
+            writer.writerow([mat_name] + cells)
+
+
+def _principled_materials():
+    """带有原理化BSDF节点的材质"""
+    return [
+        mat for mat in bpy.data.materials
+        if mat.use_nodes and any(
+            isinstance(n, bpy.types.ShaderNodeBsdfPrincipled) for n in mat.node_tree.nodes
+        )
+    ]
+
+
+class TEXTURE_OT_ProbeTextures(Operator):
+    bl_idname = "texture.probe_textures"
+    bl_label = "检查贴图覆盖"
+    bl_description = "只读取贴图文件头，生成材质×贴图类型覆盖报告，不创建任何图像数据块"
+
+    def execute(self, context):
+        scene = context.scene
+        tex_dir = bpy.path.abspath(scene.c_path_TEX)
+        if not os.path.isdir(tex_dir):
+            self.report({'ERROR'}, f"无效贴图路径: {tex_dir}")
+            return {'CANCELLED'}
+
+        suffixes = [
+            suffix for suffix, enabled in (
+                ('BaseColor', scene.connect_basecolor),
+                ('Metallic', scene.connect_metallic),
+                ('Roughness', scene.connect_roughness),
+                ('Normal', scene.connect_normal),
+                ('AO', scene.pack_orm),
+            ) if enabled
+        ]
+        mat_names = [mat.name for mat in _principled_materials()]
+        if not mat_names or not suffixes:
+            self.report({'ERROR'}, "没有需要检查的材质或贴图类型")
+            return {'CANCELLED'}
+
+        try:
+            coverage = build_texture_coverage(tex_dir, mat_names, suffixes, scene.texture_max_size)
+            report_path = os.path.join(tex_dir, "texture_coverage.csv")
+            write_coverage_report(coverage, suffixes, report_path)
+        except OSError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        counts = {}
+        for row in coverage.values():
+            for cell in row.values():
+                counts[cell['status']] = counts.get(cell['status'], 0) + 1
+        summary = ", ".join(
+            f"{label} {counts.get(status, 0)}" for status, label in (
+                ('ok', "正常"), ('missing', "缺失"), ('ambiguous', "多个匹配"),
+                ('oversized', "超尺寸"), ('unreadable', "无法读取"),
+            )
+        )
+        self.report({'INFO'}, f"{summary}。报告: {report_path}")
+        return {'FINISHED'}
+
+
 class TEXTURE_OT_ConnectTextures(Operator):
     bl_idname = "texture.connect_textures"
     bl_label = "连接材质贴图"
@@ -273,8 +1218,11 @@ class TEXTURE_OT_ConnectTextures(Operator):
         if scene.connect_normal:
             texture_types.append(('Normal', 'Normal', True, False))
 
+        missing = []
+
         def connect_textures(c_path_TEX):
-            valid_ext = {'.png', '.jpg', '.jpeg', '.tga', '.tif', '.tiff'}
+            name_index = texture_name_index(list_texture_files(c_path_TEX))
+            cache_dir = bpy.path.abspath(scene.orm_cache_dir) or os.path.join(c_path_TEX, "ORM")
             for mat in bpy.data.materials:
                 if not mat.use_nodes:
                     continue
@@ -284,28 +1232,32 @@ class TEXTURE_OT_ConnectTextures(Operator):
                 if not principled:
                     continue
 
+                mat_texture_types = texture_types
+                if scene.pack_orm:
+                    # 合并为ORM贴图的类型不再单独连接
+                    packed_suffixes = {'AO'}
+                    if scene.connect_roughness:
+                        packed_suffixes.add('Roughness')
+                    if scene.connect_metallic:
+                        packed_suffixes.add('Metallic')
+                    orm_sources = {
+                        suffix: find_texture(c_path_TEX, name_index, mat.name, suffix)
+                        for suffix in packed_suffixes
+                    }
+                    if orm_sources.get('Roughness') or orm_sources.get('Metallic'):
+                        connect_orm(mat, principled, orm_sources, cache_dir)
+                        mat_texture_types = [t for t in texture_types if t[0] not in packed_suffixes]
+                        missing.extend(
+                            f"{mat.name}/{suffix}" for suffix, path in orm_sources.items()
+                            if path is None and suffix != 'AO'
+                        )
+
                 # 新增BaseColor处理
-                for suffix, input_name, is_normal, is_color in texture_types:  # 使用动态列表
-                    tex_path = None
-                    base_name = f"{mat.name}_{suffix}"
-                    
-                    # 支持多种命名变体
-                    naming_variants = [
-                        f"{mat.name}_{suffix}",
-                        f"{mat.name}_{suffix.lower()}",
-                        f"{mat.name}_{suffix.upper()}"
-                    ]
-                    
+                for suffix, input_name, is_normal, is_color in mat_texture_types:  # 使用动态列表
                     # 扫描匹配文件
-                    for f in os.listdir(c_path_TEX):
-                        fname, fext = os.path.splitext(f)
-                        if fext.lower() not in valid_ext:
-                            continue
-                            
-                        # 检查所有可能的命名变体
-                        if any(fname.startswith(variant) for variant in naming_variants):
-                            tex_path = os.path.join(c_path_TEX, f)
-                            break
+                    tex_path = find_texture(c_path_TEX, name_index, mat.name, suffix)
+                    if not tex_path:
+                        missing.append(f"{mat.name}/{suffix}")
                     
                     if tex_path:
                         # 创建纹理节点
@@ -344,8 +1296,33 @@ class TEXTURE_OT_ConnectTextures(Operator):
                         tex_image.location = (principled.location.x + offset_x, 
                                             principled.location.y + offset_y)
 
+        def connect_orm(mat, principled, orm_sources, cache_dir):
+            """连接ORM贴图：经分离颜色节点把G/B通道接到Roughness/Metallic"""
+            nodes = mat.node_tree.nodes
+            links = mat.node_tree.links
+            packed_path = pack_orm_texture(mat.name, orm_sources, cache_dir)
+
+            tex_image = nodes.new('ShaderNodeTexImage')
+            tex_image.image = bpy.data.images.load(packed_path, check_existing=True)
+            tex_image.image.colorspace_settings.name = 'Non-Color'
+
+            separate = nodes.new('ShaderNodeSeparateColor')
+            separate.mode = 'RGB'
+            links.new(tex_image.outputs['Color'], separate.inputs['Color'])
+            if orm_sources.get('Roughness'):
+                links.new(separate.outputs['Green'], principled.inputs['Roughness'])
+            if orm_sources.get('Metallic'):
+                links.new(separate.outputs['Blue'], principled.inputs['Metallic'])
+
+            # 自动排列节点
+            tex_image.location = (principled.location.x - 700, principled.location.y + 300)
+            separate.location = (principled.location.x - 350, principled.location.y + 300)
+
         try:
             connect_textures(bpy.path.abspath(context.scene.c_path_TEX))
+            if missing:
+                print("未找到的贴图: " + ", ".join(missing))
+                self.report({'WARNING'}, f"{len(missing)} 个贴图未找到，可用“检查贴图覆盖”生成详细报告")
             self.report({'INFO'}, "贴图连接完成!")
             return {'FINISHED'}
         except Exception as e:
@@ -358,11 +1335,11 @@ class TEXTURE_OT_DisconnectTextures(Operator):
     bl_label = "断连材质贴图"
     bl_description = "断开指定类型的贴图连接并调整法线强度"
     
-    def process_single_fbx(self, input_path, output_dir, context):
+    def process_single_fbx(self, input_path, local_path, output_dir, context, stager):
         try:
             clear_scene_data(purge_orphans=False)
-            # 导入FBX
-            bpy.ops.import_scene.fbx(filepath=input_path)
+            # 导入FBX（local_path 为预读到本地的副本，未预读时与 input_path 相同）
+            bpy.ops.import_scene.fbx(filepath=local_path)
             
             # 处理所有材质
             for mat in bpy.data.materials:
@@ -391,12 +1368,12 @@ class TEXTURE_OT_DisconnectTextures(Operator):
 
             # 导出处理后的FBX
             output_path = os.path.join(output_dir, os.path.basename(input_path))
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            bpy.ops.export_scene.fbx(
-                filepath=output_path,
-                path_mode='COPY',
-                embed_textures=True
-            )
+            with stager.output(output_path) as local_output:
+                bpy.ops.export_scene.fbx(
+                    filepath=local_output,
+                    path_mode='COPY',
+                    embed_textures=True
+                )
             return True
         except Exception as e:
             self.report({'ERROR'}, f"处理 {input_path} 失败: {str(e)}")
@@ -464,18 +1441,24 @@ class TEXTURE_OT_DisconnectTextures(Operator):
         error_count = 0
         
         # 遍历所有子目录中的FBX文件
-        for root, dirs, files in os.walk(input_dir):
-            for file in files:
-                if file.lower().endswith('.fbx'):
-                    input_path = os.path.join(root, file)
-                    # 保持目录结构
-                    relative_path_TEX = os.path.relpath(root, input_dir)
-                    output_subdir = os.path.join(output_dir, relative_path_TEX)
-                    
-                    if self.process_single_fbx(input_path, output_subdir, context):
-                        processed_count += 1
-                    else:
-                        error_count += 1
+        fbx_paths = [
+            os.path.join(root, file)
+            for root, dirs, files in os.walk(input_dir)
+            for file in files if file.lower().endswith('.fbx')
+        ]
+
+        with make_file_stager(context.scene, fbx_paths) as stager:
+            for input_path, local_path in stager:
+                # 保持目录结构
+                relative_path_TEX = os.path.relpath(os.path.dirname(input_path), input_dir)
+                output_subdir = os.path.join(output_dir, relative_path_TEX)
+
+                if self.process_single_fbx(input_path, local_path, output_subdir, context, stager):
+                    processed_count += 1
+                else:
+                    error_count += 1
+        for err in stager.errors:
+            self.report({'WARNING'}, err)
         
         self.report({'INFO'}, f"处理完成! 成功: {processed_count}, 失败: {error_count}")
         return {'FINISHED'}
@@ -505,7 +1488,13 @@ class TEXTURE_PT_Panel(Panel):
         row = box.row()
         row.prop(scene, "connect_roughness", text="Roughness", toggle=True)
         row.prop(scene, "connect_normal", text="Normal", toggle=True)
+        box.prop(scene, "pack_orm", text="合并为ORM贴图")
+        if scene.pack_orm:
+            box.prop(scene, "orm_cache_dir", text="ORM缓存目录")
         
+        row = box.row()
+        row.prop(scene, "texture_max_size", text="尺寸上限")
+        row.operator("texture.probe_textures", icon='VIEWZOOM')
         box.operator("texture.connect_textures", icon='MATERIAL')
 
         # 新增断连贴图部分
@@ -528,6 +1517,200 @@ class TEXTURE_PT_Panel(Panel):
         box.operator("texture.disconnect_textures", icon='MATERIAL')
 
 # ==================== 3. 材质处理工具 ====================
+def mesh_triangle_count(mesh):
+    """网格三角面数（n边形计为n-2个三角形）"""
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    return int(loop_totals.sum()) - 2 * len(loop_totals)
+
+
+# 减面后每个物体至少保留的三角面数，避免比例为0时网格被整体塌陷
+POLY_BUDGET_MIN_TRIANGLES = 12
+
+
+def _protected_triangle_count(obj, protected_material_name):
+    """目标材质面的三角面数"""
+    target_indices = [
+        i for i, slot in enumerate(obj.material_slots)
+        if slot.material and slot.material.name == protected_material_name
+    ]
+    if not target_indices:
+        return 0
+    mesh = obj.data
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    material_indices = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    mesh.polygons.foreach_get('material_index', material_indices)
+    return int((loop_totals[np.isin(material_indices, target_indices)] - 2).sum())
+
+
+def _protected_vertices(obj, protected_material_name):
+    """需保留的顶点：目标材质面上的顶点与UV接缝（含UV岛边界）上的顶点"""
+    mesh = obj.data
+    n_polys = len(mesh.polygons)
+    n_loops = len(mesh.loops)
+    protected = np.zeros(len(mesh.vertices), dtype=bool)
+    if n_loops == 0:
+        return protected
+
+    loop_starts = np.empty(n_polys, dtype=np.int32)
+    loop_totals = np.empty(n_polys, dtype=np.int32)
+    material_indices = np.empty(n_polys, dtype=np.int32)
+    mesh.polygons.foreach_get('loop_start', loop_starts)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    mesh.polygons.foreach_get('material_index', material_indices)
+    loop_verts = np.empty(n_loops, dtype=np.int32)
+    loop_edges = np.empty(n_loops, dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_verts)
+    mesh.loops.foreach_get('edge_index', loop_edges)
+
+    # 目标材质的面
+    target_indices = [
+        i for i, slot in enumerate(obj.material_slots)
+        if slot.material and slot.material.name == protected_material_name
+    ]
+    if target_indices:
+        loop_polys = np.repeat(np.arange(n_polys), loop_totals)
+        protected[loop_verts[np.isin(material_indices[loop_polys], target_indices)]] = True
+
+    # 标记为接缝的边
+    edge_verts = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    edge_seams = np.empty(len(mesh.edges), dtype=bool)
+    mesh.edges.foreach_get('vertices', edge_verts)
+    mesh.edges.foreach_get('use_seam', edge_seams)
+    protected[edge_verts.reshape(-1, 2)[edge_seams].ravel()] = True
+
+    # UV岛边界：同一条边同一顶点在两侧面上的UV不一致
+    uv_layer = mesh.uv_layers.active
+    if uv_layer:
+        uvs = np.empty(n_loops * 2, dtype=np.float32)
+        uv_layer.data.foreach_get('uv', uvs)
+        uvs = uvs.reshape(-1, 2)
+        next_loops = np.arange(1, n_loops + 1)
+        next_loops[loop_starts + loop_totals - 1] = loop_starts
+        corner_edges = np.concatenate((loop_edges, loop_edges)).astype(np.int64)
+        corner_verts = np.concatenate((loop_verts, loop_verts[next_loops]))
+        corner_uvs = np.concatenate((uvs, uvs[next_loops]))
+        # 以 (边, 边的第几个端点) 分组，比较组内UV范围
+        keys = corner_edges * 2 + (corner_verts != edge_verts.reshape(-1, 2)[corner_edges, 0])
+        unique_keys, groups = np.unique(keys, return_inverse=True)
+        uv_min = np.full((len(unique_keys), 2), np.inf, dtype=np.float32)
+        uv_max = np.full((len(unique_keys), 2), -np.inf, dtype=np.float32)
+        np.minimum.at(uv_min, groups, corner_uvs)
+        np.maximum.at(uv_max, groups, corner_uvs)
+        split = (uv_max - uv_min).max(axis=1) > 1e-5
+        protected[corner_verts[split[groups]]] = True
+
+    return protected
+
+
+def allocate_triangle_budget(counts, weights, budget):
+    """按屏幕占比分配三角面预算，占比大的物体保留更多面，且不超过现有面数"""
+    targets = list(counts)
+    active = [i for i, count in enumerate(counts) if count > 0]
+    remaining = budget
+    while active:
+        total_weight = sum(weights[i] for i in active)
+        shares = {
+            i: remaining * (weights[i] / total_weight if total_weight > 0 else 1 / len(active))
+            for i in active
+        }
+        capped = [i for i in active if counts[i] <= shares[i]]
+        if not capped:
+            for i in active:
+                targets[i] = int(shares[i])
+            break
+        for i in capped:
+            remaining -= counts[i]
+        active = [i for i in active if i not in capped]
+    return targets
+
+
+def apply_polygon_budget(context, objects, budget, per_object, protected_material_name):
+    """对 objects 按三角面预算批量减面，返回 (减面前, 减面后, 超出预算) 三角面数
+
+    per_object 为 True 时每个物体不超过 budget，否则 objects 共享 budget。
+    共享网格只处理一次；目标材质的面与UV接缝通过顶点组降低塌陷权重加以保留。
+    每个网格的下限为目标材质面的三角面数与 POLY_BUDGET_MIN_TRIANGLES 中的较大者，
+    先从预算中扣除所有下限，剩余预算再分配给可减的三角面；
+    下限之和超出预算时全部保留下限，超出量作为第三个返回值。
+    """
+    # 共享同一网格的物体合并处理
+    mesh_users = {}
+    for obj in objects:
+        if obj.type == 'MESH' and len(obj.data.polygons):
+            mesh_users.setdefault(obj.data, []).append(obj)
+
+    meshes = list(mesh_users)
+    counts = [mesh_triangle_count(mesh) * len(mesh_users[mesh]) for mesh in meshes]
+    before = sum(counts)
+    floors = [
+        min(count, max(_protected_triangle_count(mesh_users[mesh][0], protected_material_name),
+                       POLY_BUDGET_MIN_TRIANGLES) * len(mesh_users[mesh]))
+        for mesh, count in zip(meshes, counts)
+    ]
+
+    if per_object:
+        limits = [budget * len(mesh_users[mesh]) for mesh in meshes]
+        targets = [min(count, max(limit, floor)) for count, limit, floor in zip(counts, limits, floors)]
+        overflow = sum(max(0, floor - limit) for floor, limit in zip(floors, limits))
+    else:
+        # 以世界包围盒三个方向投影面积之和近似屏幕占比
+        weights = [
+            sum(obj.dimensions.x * obj.dimensions.y
+                + obj.dimensions.y * obj.dimensions.z
+                + obj.dimensions.z * obj.dimensions.x for obj in mesh_users[mesh])
+            for mesh in meshes
+        ]
+        spare = budget - sum(floors)
+        overflow = max(0, -spare)
+        if spare > 0:
+            extras = allocate_triangle_budget(
+                [count - floor for count, floor in zip(counts, floors)], weights, spare
+            )
+        else:
+            extras = [0] * len(meshes)
+        targets = [floor + extra for floor, extra in zip(floors, extras)]
+
+    for mesh, count, target in zip(meshes, counts, targets):
+        obj = mesh_users[mesh][0]
+        if target >= count:
+            continue
+        if mesh.shape_keys:
+            print(f"跳过带形态键的物体: {obj.name}")
+            continue
+
+        # 未保护的顶点权重为1（正常塌陷），保护顶点不在组内（权重0）
+        protected = _protected_vertices(obj, protected_material_name)
+        group = obj.vertex_groups.new(name="_poly_budget")
+        group.add(np.flatnonzero(~protected).tolist(), 1.0, 'REPLACE')
+
+        modifier = obj.modifiers.new(name="_poly_budget", type='DECIMATE')
+        modifier.decimate_type = 'COLLAPSE'
+        modifier.ratio = target / count
+        modifier.vertex_group = group.name
+        modifier.vertex_group_factor = 1000.0
+
+        # 通过求值网格应用修改器，无需编辑模式与操作符上下文
+        depsgraph = context.evaluated_depsgraph_get()
+        new_mesh = bpy.data.meshes.new_from_object(
+            obj.evaluated_get(depsgraph), preserve_all_data_layers=True, depsgraph=depsgraph
+        )
+        obj.modifiers.remove(modifier)
+        for user in mesh_users[mesh]:
+            user.data = new_mesh
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+        if new_group := obj.vertex_groups.get("_poly_budget"):
+            obj.vertex_groups.remove(new_group)
+
+    after = sum(
+        mesh_triangle_count(obj.data)
+        for users in mesh_users.values() for obj in users
+    )
+    return before, after, overflow
+
+
 class MATERIAL_OT_ProcessMaterials(Operator):
     bl_idname = "material.process_materials"
     bl_label = "处理材质和法线"
@@ -538,55 +1721,88 @@ class MATERIAL_OT_ProcessMaterials(Operator):
             os.makedirs(b_path_MAT, exist_ok=True)
             purge_unused_data()
 
-            for fbx_name in [f for f in os.listdir(a_path_MAT) if f.lower().endswith(".fbx")]:
-
-                input_path = os.path.join(a_path_MAT, fbx_name)
-                output_path = os.path.join(b_path_MAT, fbx_name)
-                
-                bpy.ops.import_scene.fbx(filepath=input_path)
+            fbx_paths = [
+                os.path.join(a_path_MAT, f)
+                for f in os.listdir(a_path_MAT) if f.lower().endswith(".fbx")
+            ]
+            with make_file_stager(context.scene, fbx_paths) as stager:
+                for input_path, local_path in stager:
+                    output_path = os.path.join(b_path_MAT, os.path.basename(input_path))
+                    
+                    existing_objects = set(bpy.data.objects)
+                    bpy.ops.import_scene.fbx(filepath=local_path)
+                    # 本文件导入的物体（场景在文件之间不清空）
+                    imported_objects = [obj for obj in bpy.data.objects if obj not in existing_objects]
                 
-                # 材质处理
-                for mat in list(bpy.data.materials):
-                    if pattern.search(mat.name):
-                        base_name = pattern.sub("", mat.name)
-                        if base_mat := bpy.data.materials.get(base_name):
-                            for obj in bpy.data.objects:
-                                if obj.type == 'MESH':
-                                    for slot in obj.material_slots:
-                                        if slot.material == mat:
-                                            slot.material = base_mat
-                            bpy.data.materials.remove(mat)
+                    # 材质处理
+                    for mat in list(bpy.data.materials):
+                        if pattern.search(mat.name):
+                            base_name = pattern.sub("", mat.name)
+                            if base_mat := bpy.data.materials.get(base_name):
+                                for obj in bpy.data.objects:
+                                    if obj.type == 'MESH':
+                                        for slot in obj.material_slots:
+                                            if slot.material == mat:
+                                                slot.material = base_mat
+                                bpy.data.materials.remove(mat)
                 
-                # 法线处理（兼容4.4+版本）
-                for obj in context.scene.objects:
-                    if obj.type == 'MESH':
-                        # 处理自定义法线
-                        if hasattr(obj.data, "has_custom_normals"):
-                            if obj.data.has_custom_normals:
-                                bpy.context.view_layer.objects.active = obj
-                                bpy.ops.object.mode_set(mode='EDIT')
-                                bpy.ops.mesh.customdata_custom_splitnormals_clear()
-                                bpy.ops.object.mode_set(mode='OBJECT')
+                    # 法线处理（兼容4.4+版本）
+                    for obj in context.scene.objects:
+                        if obj.type == 'MESH':
+                            # 处理自定义法线
+                            if hasattr(obj.data, "has_custom_normals"):
+                                if obj.data.has_custom_normals:
+                                    bpy.context.view_layer.objects.active = obj
+                                    bpy.ops.object.mode_set(mode='EDIT')
+                                    bpy.ops.mesh.customdata_custom_splitnormals_clear()
+                                    bpy.ops.object.mode_set(mode='OBJECT')
                         
-                        # 设置自动平滑（兼容不同版本）
-                        mesh = obj.data
-                        if hasattr(mesh, "use_auto_smooth"):
-                            # 4.3及以下版本
-                            mesh.use_auto_smooth = False
-                        elif hasattr(mesh, "auto_smooth_enable"):
-                            # 4.4+版本
-                            mesh.auto_smooth_enable = False
+                            # 设置自动平滑（兼容不同版本）
+                            mesh = obj.data
+                            if hasattr(mesh, "use_auto_smooth"):
+                                # 4.3及以下版本
+                                mesh.use_auto_smooth = False
+                            elif hasattr(mesh, "auto_smooth_enable"):
+                                # 4.4+版本
+                                mesh.auto_smooth_enable = False
                         
-                        # 禁用面平滑
-                        for poly in mesh.polygons:
-                            poly.use_smooth = False
+                            # 禁用面平滑
+                            for poly in mesh.polygons:
+                                poly.use_smooth = False
                 
-                bpy.ops.export_scene.fbx(
-                    filepath=output_path,
-                    embed_textures=True,
-                    path_mode='COPY', 
-                )
-                purge_unused_data()
+                    # 三角面预算减面
+                    if context.scene.poly_budget_enable:
+                        before, after, overflow = apply_polygon_budget(
+                            context,
+                            imported_objects,
+                            context.scene.poly_budget,
+                            context.scene.poly_budget_mode == 'OBJECT',
+                            context.scene.target_material_name
+                        )
+                        self.report({'INFO'}, f"{os.path.basename(input_path)}: 三角面 {before} -> {after}")
+                        if overflow:
+                            self.report({'WARNING'}, (
+                                f"{os.path.basename(input_path)}: 目标材质面与最低保留面数"
+                                f"超出预算 {overflow} 个三角面"
+                            ))
+                
+                    with stager.output(output_path) as local_output:
+                        bpy.ops.export_scene.fbx(
+                            filepath=local_output,
+                            embed_textures=True,
+                            path_mode='COPY', 
+                        )
+                    # 场景在文件之间不清空，后续导出仍会嵌入这些贴图：
+                    # 删除预读目录前把贴图路径指回源文件
+                    for img in bpy.data.images:
+                        if img.source == 'FILE' and img.filepath:
+                            current = os.path.normpath(bpy.path.abspath(img.filepath))
+                            source = stager.source_path(current)
+                            if source != current:
+                                img.filepath = source
+                    purge_unused_data()
+            for err in stager.errors:
+                self.report({'WARNING'}, err)
 
         try:
             process_fbx_files(
@@ -614,6 +1830,13 @@ class MATERIAL_PT_Panel(Panel):
         box = layout.box()
         box.prop(scene, "a_path_MAT", text="输入目录")
         box.prop(scene, "b_path_MAT", text="输出目录")
+
+        box = layout.box()
+        box.prop(scene, "poly_budget_enable", text="三角面预算减面")
+        col = box.column()
+        col.enabled = scene.poly_budget_enable
+        col.prop(scene, "poly_budget_mode", expand=True)
+        col.prop(scene, "poly_budget", text="三角面预算")
         
         box.operator("material.process_materials", icon='MODIFIER')
 
@@ -627,9 +1850,11 @@ def register():
         BASE_OT_PurgeUnused,
         BASE_PT_Panel,
         UVTOOLS_OT_BatchProcess,
+        UVTOOLS_OT_AnalyzeDensity,
         UVTOOLS_PT_Panel,
 #        TEXTURE_OT_ImportFBX,
 #        TEXTURE_OT_ClearScene,
+        TEXTURE_OT_ProbeTextures,
         TEXTURE_OT_ConnectTextures,
         TEXTURE_PT_Panel,
         TEXTURE_OT_DisconnectTextures,
@@ -660,6 +1885,13 @@ def register():
         max=100.0,
         description="UV投影缩放比例"
     )
+    scene.density_tolerance = FloatProperty(
+        name="密度容差倍数",
+        default=2.0,
+        min=1.01,
+        max=100.0,
+        description="面纹素密度偏离材质中位密度超过此倍数时标记为异常"
+    )
     scene.target_material_name = StringProperty(
         name="目标材质",
         default="T_Glass_Clear_White_001",
@@ -706,6 +1938,22 @@ def register():
         default=True,
         description="是否连接Normal贴图"
     )
+    scene.pack_orm = bpy.props.BoolProperty(
+        name="合并为ORM贴图",
+        default=False,
+        description="把AO/Roughness/Metallic合并为一张通道打包贴图(R=AO, G=Roughness, B=Metallic)"
+    )
+    scene.orm_cache_dir = StringProperty(
+        name="ORM缓存目录",
+        subtype='DIR_PATH',
+        description="合并后的ORM贴图保存目录，留空使用贴图目录下的ORM文件夹"
+    )
+    scene.texture_max_size = IntProperty(
+        name="贴图尺寸上限",
+        default=4096,
+        min=1,
+        description="检查贴图覆盖时，宽或高超过此值的贴图标记为超尺寸"
+    )
 
     # 添加断开贴图属性
     scene = bpy.types.Scene
@@ -741,6 +1989,50 @@ def register():
         description="断开Alpha贴图并设置值为1"
     )
 
+    # 三角面预算属性
+    scene = bpy.types.Scene
+    scene.poly_budget_enable = bpy.props.BoolProperty(
+        name="三角面预算减面",
+        default=False,
+        description="导出前按三角面预算减面，保留目标材质的面与UV接缝"
+    )
+    scene.poly_budget_mode = bpy.props.EnumProperty(
+        name="预算范围",
+        items=[
+            ('OBJECT', "每个物体", "每个物体的三角面数不超过预算"),
+            ('FILE', "每个文件", "整个文件共享预算，按物体屏幕占比分配"),
+        ],
+        default='FILE'
+    )
+    scene.poly_budget = IntProperty(
+        name="三角面预算",
+        default=500000,
+        min=100,
+        description="三角面数上限"
+    )
+
+    # 批处理I/O属性
+    scene = bpy.types.Scene
+    scene.io_read_ahead = IntProperty(
+        name="预读文件数",
+        default=0,
+        min=0,
+        max=16,
+        description="处理当前文件时提前复制到本地的FBX数量，0为直接读写原路径"
+    )
+    scene.io_write_queue = IntProperty(
+        name="写出队列",
+        default=2,
+        min=1,
+        max=16,
+        description="等待后台移动到输出目录的导出文件上限"
+    )
+    scene.io_scratch_dir = StringProperty(
+        name="本地缓存目录",
+        subtype='DIR_PATH',
+        description="预读与写出使用的本地临时目录，留空使用系统临时目录"
+    )
+
 def unregister():
     # 注销所有类
     classes = (
@@ -750,9 +2042,11 @@ def unregister():
         BASE_OT_PurgeUnused,
         BASE_PT_Panel,
         UVTOOLS_OT_BatchProcess,
+        UVTOOLS_OT_AnalyzeDensity,
         UVTOOLS_PT_Panel,
  #        TEXTURE_OT_ImportFBX,
  #        TEXTURE_OT_ClearScene,
+        TEXTURE_OT_ProbeTextures,
         TEXTURE_OT_ConnectTextures,
         TEXTURE_PT_Panel,
         TEXTURE_OT_DisconnectTextures,
@@ -768,6 +2062,7 @@ def unregister():
     del scene.a_folder_UV
     del scene.b_folder_UV
     del scene.project_scale
+    del scene.density_tolerance
     del scene.target_material_name
     del scene.c_path_TEX
     del scene.a_path_MAT
@@ -779,6 +2074,9 @@ def unregister():
     del scene.connect_metallic
     del scene.connect_roughness
     del scene.connect_normal
+    del scene.pack_orm
+    del scene.orm_cache_dir
+    del scene.texture_max_size
 
     # 删除贴图断连属性
     scene = bpy.types.Scene
@@ -790,5 +2088,17 @@ def unregister():
     del scene.disconnect_normal
     del scene.disconnect_alpha
 
+    # 删除三角面预算属性
+    scene = bpy.types.Scene
+    del scene.poly_budget_enable
+    del scene.poly_budget_mode
+    del scene.poly_budget
+
+    # 删除批处理I/O属性
+    scene = bpy.types.Scene
+    del scene.io_read_ahead
+    del scene.io_write_queue
+    del scene.io_scratch_dir
+
 if __name__ == "__main__":
     register()
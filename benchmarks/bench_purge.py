@@ -0,0 +1,87 @@
+"""对比 purge_unused_data 与旧版逐类型扫描 + 三次 orphans_purge 的耗时
+
+用法: blender -b --factory-startup --python benchmarks/bench_purge.py -- [物体数] [重复次数]
+"""
+import os
+import sys
+import time
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ArchiCheckTools import purge_unused_data  # noqa: E402
+
+
+def purge_unused_data_legacy():
+    """旧实现：逐类型检查 users == 0，再执行三次 orphans_purge"""
+    data_types = [
+        'materials', 'textures',
+        'images', 'brushes', 'particles',
+        'actions', 'fonts', 'node_groups',
+        'armatures', 'curves', 'lattices',
+        'metaballs', 'grease_pencils', 'cameras',
+        'speakers', 'lights', 'lightprobes',
+        'collections', 'worlds'
+    ]
+    for data_type in data_types:
+        data_collection = getattr(bpy.data, data_type)
+        for item in list(data_collection):
+            if item.users == 0:
+                try:
+                    data_collection.remove(item)
+                except Exception as e:
+                    print(f"Error removing {data_type}: {item.name} - {str(e)}")
+
+    for _ in range(3):
+        bpy.ops.outliner.orphans_purge(do_recursive=True)
+
+
+def build_scene(n_objects):
+    """生成带材质、贴图的物体后删除物体，留下递归孤立数据"""
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    for i in range(n_objects):
+        mesh = bpy.data.meshes.new(f"mesh_{i}")
+        mesh.from_pydata([(0, 0, 0), (1, 0, 0), (0, 1, 0)], [], [(0, 1, 2)])
+        mat = bpy.data.materials.new(f"mat_{i}")
+        mat.use_nodes = True
+        tex = mat.node_tree.nodes.new('ShaderNodeTexImage')
+        tex.image = bpy.data.images.new(f"img_{i}", 8, 8)
+        mesh.materials.append(mat)
+        obj = bpy.data.objects.new(f"obj_{i}", mesh)
+        bpy.context.scene.collection.objects.link(obj)
+
+    # 保留一半物体，其余删除
+    for obj in list(bpy.data.objects)[::2]:
+        bpy.data.objects.remove(obj)
+
+
+def id_count():
+    return sum(len(getattr(bpy.data, attr)) for attr in ('objects', 'meshes', 'materials', 'images'))
+
+
+def bench(func, n_objects, repeat):
+    timings = []
+    for _ in range(repeat):
+        build_scene(n_objects)
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), id_count()
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    n_objects = int(argv[0]) if len(argv) > 0 else 2000
+    repeat = int(argv[1]) if len(argv) > 1 else 3
+
+    legacy_time, legacy_left = bench(purge_unused_data_legacy, n_objects, repeat)
+    new_time, new_left = bench(purge_unused_data, n_objects, repeat)
+
+    print(f"物体数: {n_objects}, 重复: {repeat}")
+    print(f"旧实现:  {legacy_time:.4f}s, 剩余数据块 {legacy_left}")
+    print(f"新实现:  {new_time:.4f}s, 剩余数据块 {new_left}")
+    print(f"加速比:  {legacy_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()